@@ -0,0 +1,17 @@
+"""
+Runtime type checking switch. Checks by typeguard are skipped when python runs optimized (-O) or when environment
+variable 'PHX_DISABLE_TYPECHECK' is set to '1'.
+"""
+
+import os
+
+import typeguard
+
+
+def _identity(obj):
+    return obj
+
+
+TYPECHECK_ENABLED = __debug__ and os.environ.get("PHX_DISABLE_TYPECHECK") != "1"
+
+typechecked = typeguard.typechecked if TYPECHECK_ENABLED else _identity
@@ -1,7 +1,7 @@
 import argparse
 import logging
 
-from typeguard import typechecked
+from phx_basics._typecheck import typechecked
 
 from phx_basics.logging_tools import logging_format
 
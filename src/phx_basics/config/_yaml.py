@@ -0,0 +1,9 @@
+"""
+YAML loader shared by config modules. Loader of libyaml bindings is used when available, they are much faster; they
+are available only when PyYAML is built with system package libyaml.
+"""
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
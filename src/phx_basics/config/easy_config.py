@@ -1,11 +1,13 @@
 import typing
-import typeguard
 import yaml
 from enum import Enum
 
+from phx_basics._typecheck import typechecked
+from phx_basics.config._yaml import SafeLoader
 from phx_basics.file import check_file
 from phx_basics.type import PathType
 
+
 class EasyType(Enum):
     """
     Allowed types for yaml config
@@ -17,7 +19,7 @@ class EasyType(Enum):
     FLOAT = float
 
 
-@typeguard.typechecked
+@typechecked
 class EasyVariable:
     def __init__(self, type: EasyType = None, can_be_none: bool = False):
         self.type = type
@@ -55,6 +57,35 @@ class EasyCfg:
 
     """
 
+    # specification of variables (name, type, is_required, default_value, can_be_none), prepared per subclass
+    _easy_spec = tuple()
+    _invalid_attributes = tuple()
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Collect EasyVariables once when the config class is created, instances then only walk the prepared
+        specification.
+        """
+        super().__init_subclass__(**kwargs)
+        easy_spec = list()
+        invalid_attributes = list()
+        for attribute_name in dir(cls):
+            if attribute_name.startswith("_"):
+                continue
+            attribute = getattr(cls, attribute_name)
+            if callable(attribute):
+                continue
+            if isinstance(attribute, EasyVariable):
+                easy_spec.append((attribute_name,
+                                  attribute.type.value if attribute.type else None,
+                                  not isinstance(attribute, EasyOptVariable),
+                                  getattr(attribute, "default_value", None),
+                                  attribute.can_be_none))
+            else:
+                invalid_attributes.append(attribute_name)
+        cls._easy_spec = tuple(easy_spec)
+        cls._invalid_attributes = tuple(invalid_attributes)
+
     def __init__(self, config_path: PathType):
         self._config_path = config_path
         self._load_config()
@@ -63,37 +94,31 @@ class EasyCfg:
         self._check_and_assign_variables(self._load_yaml())
 
     def _check_and_assign_variables(self, cfg_variables):
-        attribute_names = [attr for attr in dir(self) if not callable(getattr(self, attr)) and
-                           not attr.startswith("__") and not attr.startswith("_")]
-        for attribute_name in attribute_names:
-            attribute = getattr(self, attribute_name)
-            if isinstance(attribute, EasyOptVariable):
-                if attribute_name in cfg_variables:
-                    self._set_attr(attribute_name, attribute.type, cfg_variables[attribute_name], attribute.can_be_none)
-                else:
-                    self._set_attr(attribute_name, attribute.type, attribute.default_value, attribute.can_be_none)
-            elif isinstance(attribute, EasyVariable):
-                if attribute_name not in cfg_variables:
-                    raise ValueError(f"Variable '{attribute_name}' is missing in variables '{cfg_variables}'")
-                self._set_attr(attribute_name, attribute.type, cfg_variables[attribute_name], attribute.can_be_none)
+        if self._invalid_attributes:
+            raise ValueError(f"Attribute '{self._invalid_attributes[0]}' must be instance of EasyVariable.")
+        for attribute_name, value_type, is_required, default_value, can_be_none in self._easy_spec:
+            if attribute_name in cfg_variables:
+                value = cfg_variables[attribute_name]
+            elif is_required:
+                raise ValueError(f"Variable '{attribute_name}' is missing in variables '{cfg_variables}'")
             else:
-                raise ValueError(f"Attribute '{attribute_name}' must be instance of EasyVariable.")
+                value = default_value
+            self._set_attr(attribute_name, value_type, value, can_be_none)
 
     def _load_yaml(self):
         check_file(self._config_path)
-        with open(self._config_path) as fin:
-            return yaml.safe_load(fin)
+        with open(self._config_path, "rb") as fin:
+            return yaml.load(fin.read(), Loader=SafeLoader)
 
-    def _set_attr(self, attribute_name: str, attribute_type: EasyType, value, can_be_none: bool):
-        if attribute_type:
+    def _set_attr(self, attribute_name: str, value_type: typing.Optional[type], value, can_be_none: bool):
+        if value_type:
             try:
-                if value is None and not can_be_none:
-                    raise ValueError()
-                elif value is None and can_be_none:
-                    value = None
-                elif not isinstance(value, attribute_type.value):
-                    value = attribute_type.value(value)
+                if value is None:
+                    if not can_be_none:
+                        raise ValueError()
+                else:
+                    value = value if isinstance(value, value_type) else value_type(value)
             except (ValueError, TypeError):
-                raise TypeError(f"Variable '{attribute_name}' should be type '{attribute_type.value}', "
+                raise TypeError(f"Variable '{attribute_name}' should be type '{value_type}', "
                                 f"but is '{type(value)}' in config '{self._config_path}'")
         setattr(self, attribute_name, value)
@@ -5,6 +5,7 @@ import typing
 import logging
 import yaml
 from phx_basics.file import check_file, list2file
+from phx_basics.config._yaml import SafeLoader
 
 from pydantic import dataclasses
 from enum import Enum
@@ -96,9 +97,9 @@ class YAMLConfig:
 
     def _load(self):
         check_file(self._config_path)
-        with open(self._config_path) as fin:
-            variables = yaml.safe_load(fin)
-            self._load_variables(variables)
+        with open(self._config_path, "rb") as fin:
+            variables = yaml.load(fin.read(), Loader=SafeLoader)
+        self._load_variables(variables)
 
     def _load_variables(self, variables):
         """
@@ -1,12 +1,15 @@
 import argparse
-import multiprocessing
+import os
 
-from typeguard import typechecked
+from phx_basics._typecheck import typechecked
+
+# cores available to this process (respects affinity set e.g. by taskset or cluster scheduler)
+_MAX_CORES = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
 
 
 @typechecked
 def check_cores(cores: int, autocorrect: bool = True):
-    max_local_cores = multiprocessing.cpu_count()
+    max_local_cores = _MAX_CORES
     assert cores >= 0, "Parameter 'cores' must be higher or equal to 0"
     if autocorrect:
         if cores > max_local_cores:
@@ -1,18 +1,25 @@
 import logging
 import os
+import stat
 import zipfile
-from pathlib import Path
-from typeguard import typechecked
+from typing import Union
+from phx_basics._typecheck import typechecked
 from phx_basics.type import PathType
 
+_logger = logging.getLogger(__name__)
+
 
 @typechecked
 def check_dir(filepath: PathType):
-    if not Path(filepath).is_dir():
-        if Path(filepath).is_file():
-            raise NotADirectoryError(f"Path '{str(filepath)}' is file, not directory")
+    try:
+        mode = os.stat(filepath).st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        mode = 0
+    if not stat.S_ISDIR(mode):
+        if stat.S_ISREG(mode):
+            raise NotADirectoryError(f"Path '{filepath}' is file, not directory")
         else:
-            raise NotADirectoryError(f"Directory '{str(filepath)}' doesn't exist")
+            raise NotADirectoryError(f"Directory '{filepath}' doesn't exist")
 
 
 @typechecked
@@ -29,39 +36,42 @@ def mkpdirp(file_path: PathType):
     os.makedirs(directory, exist_ok=True)
 
 
-def zip_folder(folder_path: PathType, output_path: PathType):
+def _scan_folder(folder_path: PathType, relative_dir: str = ""):
+    """
+    Recursively yield (absolute_path, relative_path) of all files and subfolders. Symlinks to directories are yielded,
+    but not followed.
+    """
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            relative_path = os.path.join(relative_dir, entry.name)
+            yield entry.path, relative_path
+            if entry.is_dir() and not entry.is_symlink():
+                yield from _scan_folder(entry.path, relative_path)
+
+
+def zip_folder(folder_path: PathType, output_path: PathType, compresslevel: Union[int, None] = None,
+               compression: int = zipfile.ZIP_DEFLATED):
     """
     Zip the contents of an entire folder (without that folder included
     in the archive). Empty subfolders will be included in the archive
     as well.
     :param folder_path: path to input folder
     :param output_path: path to output file
+    :param compresslevel: compression level (for deflate 0-9), None for default level; use 1 for large folders
+    :param compression: zipfile compression method; zipfile.ZIP_STORED skips compression (fastest, biggest archive),
+                        zipfile.ZIP_ZSTANDARD (python 3.14+) is much faster than deflate for similar ratio
     :return:
     """
     check_dir(folder_path)
-    # Retrieve the paths of the folder contents.
-    contents = os.walk(folder_path)
     try:
-        zip_file = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
-        for root, folders, files in contents:
-            # Include all subfolders, including empty ones.
-            for folder_name in folders:
-                absolute_path = os.path.join(root, folder_name)
-                relative_path = absolute_path.replace(folder_path, '')
-                logging.debug("Adding '%s' to archive." % relative_path)
-                zip_file.write(absolute_path, relative_path)
-            for file_name in files:
-                absolute_path = os.path.join(root, file_name)
-                relative_path = absolute_path.replace(folder_path, '')
-                logging.debug("Adding '%s' to archive." % relative_path)
+        with zipfile.ZipFile(output_path, 'w', compression, compresslevel=compresslevel) as zip_file:
+            for absolute_path, relative_path in _scan_folder(folder_path):
+                _logger.debug("Adding '%s' to archive.", relative_path)
                 zip_file.write(absolute_path, relative_path)
-        logging.debug("'%s' created successfully." % output_path)
-        zip_file.close()
+        _logger.debug("'%s' created successfully.", output_path)
     except IOError as message:
         raise IOError(message)
     except OSError as message:
         raise OSError(message)
     except zipfile.BadZipfile as message:
         raise Exception(message)
-
-
@@ -7,19 +7,39 @@ General utilities for working with files, directories, filesystems
 
 import os
 import shutil
+import stat
 import gzip
-import re
+from itertools import islice
 from pathlib import Path
 from typing import Iterable
-from typeguard import typechecked
+from phx_basics._typecheck import typechecked
 from phx_basics.dir import check_dir
 from phx_basics.type import PathType
 
+_READ_BUFFER_SIZE = 1 << 20  # 1 MiB
+_COPY_CHUNK_SIZE = 1 << 30  # 1 GiB
+_WRITE_BATCH_LINES = 1 << 16
+
+
+def _read_lines(file_path: PathType):
+    """
+    Read whole file at once and split it to lines without line separators (universal newlines as in line iteration)
+    """
+    with open(file_path) as fin:
+        lines = fin.read().split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
 
 @typechecked
 def check_file(filepath: PathType):
-    if not Path(filepath).is_file():
-        if Path(filepath).is_dir():
+    try:
+        mode = os.stat(filepath).st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        mode = 0
+    if not stat.S_ISREG(mode):
+        if stat.S_ISDIR(mode):
             raise FileExistsError(f"Path '{str(filepath)}' is directory, not file")
         else:
             raise FileNotFoundError(f"File '{str(filepath)}' doesn't exist")
@@ -34,14 +54,10 @@ def file2list(file_path: PathType, strip=True):
     :return: list of rows
     """
     check_file(file_path)
+    if strip:
+        return [line.strip() for line in _read_lines(file_path)]
     with open(file_path) as fin:
-        if strip:
-            lines = list()
-            for line in fin:
-                lines.append(line.strip())
-            return lines
-        else:
-            return fin.readlines()
+        return fin.readlines()
 
 
 @typechecked
@@ -52,11 +68,7 @@ def file2set(file_path: PathType):
     :return: set of striped lines
     """
     check_file(file_path)
-    l_set = set()
-    with open(file_path) as l_fin:
-        for l_l in l_fin:
-            l_set.add(l_l.strip())
-    return l_set
+    return {line.strip() for line in _read_lines(file_path)}
 
 
 def list2file(lines: Iterable, file_path: PathType, add_sep=True):
@@ -70,8 +82,13 @@ def list2file(lines: Iterable, file_path: PathType, add_sep=True):
     check_dir(Path(file_path).parent)
     with open(file_path, "w") as fout:
         if add_sep:
-            for line in lines:
-                fout.write(line+os.linesep)
+            # join lines in batches, so the whole output doesn't have to be in memory as one string
+            lines = iter(lines)
+            batch = list(islice(lines, _WRITE_BATCH_LINES))
+            while batch:
+                batch.append("")
+                fout.write(os.linesep.join(batch))
+                batch = list(islice(lines, _WRITE_BATCH_LINES))
         else:
             fout.writelines(lines)
 
@@ -84,15 +101,13 @@ def file2dict(file_path: PathType, sep="\t"):
     :return: dictionary
     """
     check_file(file_path)
-    out_dict = dict()
-    with open(file_path) as fin:
-        for n, l in enumerate(fin):
-            columns = l.split(sep)
-            if len(columns) != 2:
-                raise ValueError(f"Making dict from file '{file_path}', but there is {len(columns)} "
-                                 f"columns instead of 2 on row  {n}: '{l}'")
-            out_dict[columns[0].strip()] = columns[1].strip()
-    return out_dict
+    lines = _read_lines(file_path)
+    rows = [line.split(sep) for line in lines]
+    n = next((n for n, columns in enumerate(rows) if len(columns) != 2), None)
+    if n is not None:
+        raise ValueError(f"Making dict from file '{file_path}', but there is {len(rows[n])} "
+                         f"columns instead of 2 on row  {n}: '{lines[n]}'")
+    return {key.strip(): value.strip() for key, value in rows}
 
 
 def file2iter(file_path: PathType, strip=True, split=False):
@@ -104,7 +119,7 @@ def file2iter(file_path: PathType, strip=True, split=False):
     :return: iterator per line
     """
     check_file(file_path)
-    with open(file_path) as fin:
+    with open(file_path, buffering=_READ_BUFFER_SIZE) as fin:
         for line in fin:
             if strip:
                 yield line.strip() if split is not None else line.strip().split()
@@ -112,16 +127,37 @@ def file2iter(file_path: PathType, strip=True, split=False):
                 yield line if split is not None else line.split()
 
 
+def fast_copy(src: PathType, dst: PathType):
+    """
+    Copy content of file (not metadata). Data are copied inside kernel by os.copy_file_range when available
+    (reflink on copy-on-write filesystems), otherwise by shutil.copyfile (which uses os.sendfile on Linux).
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc:
+                # pseudo-files (e.g. procfs, sysfs) report zero size, copy_file_range may copy nothing from them
+                if os.fstat(fsrc.fileno()).st_size > 0:
+                    with open(dst, "wb") as fdst:
+                        while os.copy_file_range(fsrc.fileno(), fdst.fileno(), _COPY_CHUNK_SIZE):
+                            pass
+                    return
+        except OSError:
+            # e.g. copy across filesystems on older kernels, unsupported filesystem
+            pass
+    shutil.copyfile(src, dst)
+
+
 def safe_copy(src: PathType, dst: PathType):
     """
     copy file even if dst exists and even dst is a symlink
     """
-    if os.path.exists(dst):
+    if os.path.lexists(dst):
         if os.path.islink(dst):
             os.unlink(dst)
         else:
             os.remove(dst)
-    shutil.copy(src, dst)
+    fast_copy(src, dst)
+    shutil.copymode(src, dst)
 
 
 def file2id_dict(file: PathType, strip: bool = True, delimiter: str = "\t"):
@@ -131,18 +167,13 @@ def file2id_dict(file: PathType, strip: bool = True, delimiter: str = "\t"):
     """
     check_file(file)
     id_dict = dict()
-    prev_key = None
-    value_list = None
     for line in file2iter(file, strip=strip):
-        columns = line.strip().split(delimiter)
-        assert len(columns) >= 2, columns
-        key = columns[0]
-        value = columns[1:]
-        if key != prev_key:
-            value_list = list()
-            id_dict[key] = value_list
-            prev_key = key
-        value_list.append(value)
+        key, separator, rest = (line if strip else line.strip()).partition(delimiter)
+        assert separator, line
+        value_list = id_dict.get(key)
+        if value_list is None:
+            value_list = id_dict[key] = list()
+        value_list.append(tuple(rest.split(delimiter)))
     return id_dict
 
 
@@ -150,5 +181,4 @@ def file2id_dict(file: PathType, strip: bool = True, delimiter: str = "\t"):
 class GzipOpener:
     @staticmethod
     def open_file(input_path: str):
-        _open = (lambda x: open(x, "r")) if not re.fullmatch("^.*\\.gz$", input_path) else lambda x: gzip.open(x, "rt")
-        return _open(input_path)
+        return gzip.open(input_path, "rt") if input_path.endswith(".gz") else open(input_path, "r")
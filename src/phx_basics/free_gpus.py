@@ -2,8 +2,7 @@ import os
 import re
 import tempfile
 
-from typeguard import typechecked
-
+from phx_basics._typecheck import typechecked
 from phx_basics.arg_parser import ArgParser
 from phx_basics.file import file2list
 from phx_basics.shell import shell
@@ -1,27 +1,69 @@
 import re
 import os
+import json
+import fcntl
 import logging
 import shutil
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from enum import Enum
 from pathlib import Path
-from tempfile import TemporaryDirectory, NamedTemporaryFile
+from tempfile import TemporaryDirectory
 from typing import Union, Iterable
 
-from typeguard import typechecked
+from phx_basics._typecheck import typechecked
 
 from phx_secure.gitlab import SecurePhxGitRepository
-from phx_basics.file import file2list
-from phx_basics.shell import shell
+from phx_basics.file import fast_copy, file2list
 
 from phx_basics.type import PathType
 
+try:
+    # optional, commit hashes are resolved in process instead of git checkout + rev-parse
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 _logger = logging.getLogger(__name__)
 
+# commit part (after the last '#') of git path
+_GIT_PATH_COMMIT_RE = re.compile("[0-9a-f]+")
+_GIT_PATH_COMMIT_OR_BRANCH_RE = re.compile("[0-9a-zA-Z_-]+")
+_SPARSE_PATTERN_SPECIAL_CHARS_RE = re.compile(r"([\\*?\[])")
+_COMMIT_HASH_RE = re.compile("[0-9a-f]{4,40}")
+_FULL_COMMIT_HASH_RE = re.compile("[0-9a-f]{40}")
+_NOT_PATH_SAFE_CHARS_RE = re.compile("[^0-9a-zA-Z._-]")
+# file in .git directory marking clones created (with sparse checkout) by PhxGitRepository, other clones (e.g. user's
+# repo_path) are never made sparse
+_SPARSE_CLONE_MARKER = "phx_basics_sparse_clone"
+# (server, repository, commit) -> full commit hash; filled only for commits given by hash
+_RESOLVED_COMMIT_HASHES = dict()
+
+
+def _git(args, cwd, check=True, batch=False):
+    """
+    Run git command with output captured in memory
+    :param check: raise subprocess.CalledProcessError (with git's stderr) when git fails
+    :param batch: never prompt (for credentials, ssh passphrase or host key), fail instead
+    :return: subprocess.CompletedProcess
+    """
+    _logger.debug("Running command: 'git %s' in %s", " ".join(args), cwd)
+    if not batch:
+        return subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True, check=check)
+    return subprocess.run(['git', '-c', 'core.sshCommand=ssh -o BatchMode=yes', *args], cwd=cwd,
+                          stdin=subprocess.DEVNULL, capture_output=True, text=True, check=check,
+                          env={**os.environ, "GIT_TERMINAL_PROMPT": "0"})
+
+
 @typechecked
 class PhxGitRepository(SecurePhxGitRepository):
 
     DELIMITER = '#'
     DEFAULT_PHX_GITLAB_SERVER = 'git@gitlab.int.phonexia.com'
+    # persistent clones of repositories used when repo_path isn't given
+    REPO_CACHE_ROOT = Path(os.environ.get("PHX_GIT_CACHE", "~/.cache/phx_basics/git")).expanduser()
 
     KNOWN_PHX_REPOSITORIES = {
         'bsapi':        "CORE-team/BSAPI.git",       #  34,  #
@@ -57,7 +99,15 @@ class PhxGitRepository(SecurePhxGitRepository):
             raise ValueError(f"Unknown git repository id '{repository}' - use one of strings from known "
                              f"repositories: '{PhxGitRepository.KNOWN_PHX_REPOSITORIES.keys()}'")
 
-        self._repository = PhxGitRepository.KNOWN_PHX_REPOSITORIES[repository]
+        self._set_repository(PhxGitRepository.KNOWN_PHX_REPOSITORIES[repository])
+
+    def _set_repository(self, repository):
+        """
+        Set repository path on the server together with values derived from it
+        """
+        self._repository = repository
+        self._is_lfs = repository == self.KNOWN_PHX_REPOSITORIES['datasets']
+        self._repo_dirname = repository.split("/")[-1].replace(".git", "")
 
     def download_files(self, mode: str, input: Union[PathType, Iterable[PathType]], output_dir, use_sub_dirs=False):
         """
@@ -75,138 +125,356 @@ class PhxGitRepository(SecurePhxGitRepository):
                 assert Path(file).is_file(), file
                 input_strings.extend(file2list(file))
         elif mode == PhxGitRepository.InputMode.STRING.value:
-            input_strings = str(input)
+            input_strings = [str(input)] if isinstance(input, (str, Path)) else [str(git_path) for git_path in input]
         else:
             raise ValueError("Unknown mode option")
+        # drop repeated git paths (keeping order), they would be downloaded again only to collide in output_dir
+        input_strings = list(dict.fromkeys(input_strings))
+        self._download_files_in_repo_dir(input_strings, output_dir, use_sub_dirs)
 
+    def _download_files_in_repo_dir(self, input_strings, output_dir, use_sub_dirs):
+        """
+        Download files from the repository in repo_path or in the cache (locked for the time of download)
+        """
         if self._repo_path:
-            _logger.debug(f"Download files from repository in {self._repo_path}")
+            _logger.debug("Download files from repository in %s", self._repo_path)
             # use existing directory
             self._download_files(input_strings, output_dir, self._repo_path, use_sub_dirs)
         else:
-            _logger.debug(f"Clone repository {self._repository} into temporary directory")
-            # create temporary directory for cloning the git repository
-            with TemporaryDirectory() as tmpdir:
-                self._download_files(input_strings, output_dir, tmpdir, use_sub_dirs)
+            with self._cached_repo_dir() as cache_dir:
+                _logger.debug("Download files from repository %s cached in %s", self._repository, cache_dir)
+                self._download_files(input_strings, output_dir, cache_dir, use_sub_dirs)
 
     def _download_files(self, input_strings, output_dir, repo_path, use_sub_dirs):
         self._clone_if_needed(repo_path)
         repo_path = os.path.join(repo_path, self._repository_dir())
         os.makedirs(output_dir, exist_ok=True)
-        downloaded_files = set()
+        # group paths by commit, so every commit is checked out (and LFS pulled) only once
+        commit_paths = defaultdict(list)
+        output_paths = set()
         for git_path in input_strings:
-            # shell commands output files
-            checkout_stderr = os.path.join(repo_path, "git_checkout.stderr")
-            lfs_stdout = os.path.join(repo_path, "git_lfs_pull.stdout")
             try:
-                _logger.debug(f"Git-downloading '{git_path}' from repo path '{repo_path}'")
                 path, commit = git_path.split(self.DELIMITER)
-
-                # Checkout correct commit
-                shell(['git', 'fetch', '--quiet'], cwd=repo_path)
-                shell(['git', 'checkout', commit, '--quiet'], cwd=repo_path, stderr=checkout_stderr)
-
-                if self._is_lfs_repository():
-                    # For LFS repository pull the needed objects
-                    shell([' '.join(['git', 'lfs', 'pull', f'--include="{path}"', '--exclude=""'])],
-                           stdout=lfs_stdout, cwd=repo_path, shell=True)
-
-                # Copy file
-                output_path = os.path.join(output_dir, path if use_sub_dirs else os.path.basename(path))
-                if output_path in downloaded_files:
-                    raise ValueError(f"File with basename '{os.path.basename(path)}' would be stored multiple times in"
-                                     f"'{output_dir}' - cancelling download")
-                if os.path.exists(output_path):
-                    shutil.rmtree(output_path, ignore_errors=True)
-                downloaded_path = os.path.join(repo_path, path)
-                if os.path.isdir(downloaded_path):
-                    shutil.copytree(downloaded_path, output_path)
-                else:
-                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                    shutil.copy2(downloaded_path, output_path)
-                downloaded_files.add(output_path)
+            except ValueError as e:
+                raise RuntimeError(f"Error fetching '{git_path}' from GIT: {e}")
+            output_path = os.path.join(output_dir, path if use_sub_dirs else os.path.basename(path))
+            if output_path in output_paths:
+                raise RuntimeError(f"Error fetching '{git_path}' from GIT: File with basename "
+                                   f"'{os.path.basename(path)}' would be stored multiple times in '{output_dir}' - "
+                                   f"cancelling download")
+            output_paths.add(output_path)
+            commit_paths[commit].append(path)
+        is_lfs_repository = self._is_lfs_repository()
+
+        errors = dict()
+        if len(commit_paths) == 1:
+            # single commit is checked out directly in the clone
+            commit, paths = next(iter(commit_paths.items()))
+            try:
+                self._checkout_commit(commit, repo_path, paths)
+                self._copy_paths(paths, repo_path, output_dir, use_sub_dirs, is_lfs_repository)
             except Exception as e:
+                errors[commit] = e
+        else:
+            # commits are fetched one by one (fetch locks the repository), then checked out into separate worktrees
+            # in parallel - blobs and LFS objects of all commits are downloaded at the same time
+            revisions = dict()
+            for commit in commit_paths:
                 try:
-                    reference_is_not_a_tree = any(
-                        [l.find("reference is not a tree") != -1 for l in file2list(checkout_stderr)])
-                    if reference_is_not_a_tree and self._download_dataset_fallback(git_path, output_dir, repo_path,
-                                                                                   use_sub_dirs):
-                        # if fallback for datasets was succesfull - ignore former error
-                        continue
-                except ValueError:
-                    pass
-                raise RuntimeError(f"Error fetching '{git_path}' from GIT: {e}")
+                    revisions[commit] = self._fetch_commit(commit, repo_path)
+                except Exception as e:
+                    errors[commit] = e
+            _git(['worktree', 'prune'], repo_path)
+            # no revisions when all fetches failed, their errors are reported below
+            with ThreadPoolExecutor(max_workers=max(1, min(8, len(revisions)))) as executor:
+                futures = {executor.submit(self._download_in_worktree, revision, commit_paths[commit], repo_path,
+                                           output_dir, use_sub_dirs, is_lfs_repository): commit
+                           for commit, revision in revisions.items()}
+                for future in as_completed(futures):
+                    if future.exception() is not None:
+                        errors[futures[future]] = future.exception()
+                        if not self._is_missing_commit_error(future.exception()):
+                            # fail fast, missing commits only can still be downloaded by fallback
+                            executor.shutdown(cancel_futures=True)
+                            break
+
+        # other errors first, they would make fallback downloads useless
+        for commit, e in sorted(errors.items(), key=lambda error: self._is_missing_commit_error(error[1])):
+            git_paths = [f"{path}{self.DELIMITER}{commit}" for path in commit_paths[commit]]
+            if self._is_missing_commit_error(e) and self._download_dataset_fallback(git_paths, output_dir,
+                                                                                    use_sub_dirs):
+                # if fallback for datasets was succesfull - ignore former error
+                continue
+            git_stderr = e.stderr if isinstance(e, subprocess.CalledProcessError) else ""
+            raise RuntimeError(f"Error fetching '{', '.join(git_paths)}' from GIT: {e}\n{git_stderr.strip()}")
+
+    @staticmethod
+    def _is_missing_commit_error(e):
+        return isinstance(e, subprocess.CalledProcessError) and \
+            ("reference is not a tree" in e.stderr or "invalid reference" in e.stderr)
+
+    def _download_in_worktree(self, revision, paths, repo_path, output_dir, use_sub_dirs, is_lfs_repository):
+        """
+        Checkout revision into temporary worktree of the repository and copy the paths from it
+        """
+        with TemporaryDirectory() as tmpdir:
+            worktree_path = os.path.join(tmpdir, self._repository_dir())
+            _logger.debug("Checkout %s into worktree %s", revision, worktree_path)
+            _git(['worktree', 'add', '--detach', '--no-checkout', worktree_path, revision], repo_path)
+            try:
+                if self._is_sparse_clone(repo_path):
+                    _git(['sparse-checkout', 'set', '--no-cone', *self._sparse_checkout_patterns(paths)],
+                         worktree_path)
+                _git(['reset', '--hard', '--quiet'], worktree_path)
+                self._copy_paths(paths, worktree_path, output_dir, use_sub_dirs, is_lfs_repository)
             finally:
-                # remove temporary files (our shell() func doesn't allow output to dummy string io)
-                shutil.rmtree(checkout_stderr, ignore_errors=True)
-                shutil.rmtree(lfs_stdout, ignore_errors=True)
+                _git(['worktree', 'remove', '--force', worktree_path], repo_path, check=False)
+
+    @staticmethod
+    def _copy_paths(paths, work_tree, output_dir, use_sub_dirs, is_lfs_repository):
+        """
+        Copy paths from checked out work tree into output directory
+        """
+        _logger.debug("Git-downloading '%s' from work tree '%s'", paths, work_tree)
+        if is_lfs_repository:
+            # For LFS repository pull the needed objects of all paths at once
+            _git(['lfs', 'pull', f'--include={",".join(paths)}', '--exclude='], work_tree)
+        for path in paths:
+            output_path = os.path.join(output_dir, path if use_sub_dirs else os.path.basename(path))
+            if os.path.isdir(output_path) and not os.path.islink(output_path):
+                shutil.rmtree(output_path, ignore_errors=True)
+            elif os.path.lexists(output_path):
+                os.unlink(output_path)
+            downloaded_path = os.path.join(work_tree, path)
+            # content is copied together with mode (executable scripts), other metadata of checked out files are
+            # irrelevant
+            if os.path.isdir(downloaded_path):
+                shutil.copytree(downloaded_path, output_path, copy_function=PhxGitRepository._copy_file)
+            else:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                PhxGitRepository._copy_file(downloaded_path, output_path)
+
+    @staticmethod
+    def _copy_file(src, dst):
+        fast_copy(src, dst)
+        shutil.copymode(src, dst)
 
     def _is_lfs_repository(self):
-        if self._repository in [self.KNOWN_PHX_REPOSITORIES['datasets']]:
-            return True
-        return False
+        return self._is_lfs
 
     def _clone_if_needed(self, path):
-        if not os.path.exists(os.path.join(path, self._repository_dir())):
-            _logger.debug(f"Cloning git repository {self._repository}")
-            if ":" in self._server:
-                repo = f"{self._server}/{self._repository}"
-            else:
-                repo = f"{self._server}:{self._repository}"
-            shell(['git', 'clone', repo, '--quiet'], cwd=path)
+        clone_path = os.path.join(path, self._repository_dir())
+        if not os.path.exists(clone_path):
+            _logger.debug("Cloning git repository %s", self._repository)
+            # clone is moved into place only when it's complete, clone interrupted (e.g. killed job) isn't reused
+            with TemporaryDirectory(dir=path, prefix=f".{self._repository_dir()}.") as tmpdir:
+                tmp_clone_path = os.path.join(tmpdir, self._repository_dir())
+                # only the newest commit without file contents, needed commits and blobs are fetched on demand
+                _git(['clone', '--depth=1', '--filter=blob:none', '--no-checkout', '--no-tags',
+                      self._repository_url(), tmp_clone_path, '--quiet'], tmpdir)
+                # materialize only requested paths on checkout
+                _git(['sparse-checkout', 'init', '--no-cone'], tmp_clone_path)
+                Path(tmp_clone_path, ".git", _SPARSE_CLONE_MARKER).touch()
+                os.replace(tmp_clone_path, clone_path)
+
+    @staticmethod
+    def _is_sparse_clone(repo_path):
+        return os.path.exists(os.path.join(repo_path, ".git", _SPARSE_CLONE_MARKER))
+
+    @staticmethod
+    def _write_sparse_checkout(repo_path, paths):
+        """
+        Restrict working tree to paths (files or directories) on next checkout. Patterns are written directly, as
+        'git sparse-checkout set' would update the working tree immediately - at the commit checked out before.
+        """
+        with open(os.path.join(repo_path, ".git", "info", "sparse-checkout"), "w") as fout:
+            fout.writelines(f"{pattern}\n" for pattern in PhxGitRepository._sparse_checkout_patterns(paths))
+
+    @staticmethod
+    def _sparse_checkout_patterns(paths):
+        # anchored gitignore-like patterns matching exactly the path
+        return sorted({"/" + _SPARSE_PATTERN_SPECIAL_CHARS_RE.sub(r"\\\1", path.strip("/")) for path in paths})
+
+    @staticmethod
+    def _is_shallow(repo_path):
+        return os.path.exists(os.path.join(repo_path, ".git", "shallow"))
+
+    @staticmethod
+    def _has_commit(commit, repo_path):
+        return _git(['cat-file', '-e', f'{commit}^{{commit}}'], repo_path, check=False).returncode == 0
+
+    def _fetch_commit(self, commit, repo_path):
+        """
+        Make commit (hash, branch or tag) available in repository. Hash present in repository is used without network
+        access, otherwise just the commit itself is fetched (so branches are always up to date).
+        :return: revision to checkout
+        """
+        if _COMMIT_HASH_RE.fullmatch(commit) and self._has_commit(commit, repo_path):
+            return commit
+        shallow = self._is_shallow(repo_path)
+        fetch = _git(['fetch', '--quiet'] + (['--depth=1'] if shallow else []) + ['origin', commit], repo_path,
+                     check=False)
+        if fetch.returncode == 0:
+            return _git(['rev-parse', 'FETCH_HEAD'], repo_path).stdout.strip()
+        # commit can't be fetched directly (e.g. abbreviated hash) - fetch whole history of commits of all branches
+        # (shallow clone is single-branch, its default refspec would deepen just the default branch)
+        _logger.debug("Commit %s can't be fetched directly, fetch all commits into %s", commit, repo_path)
+        _git(['fetch', '--quiet'] + (['--unshallow'] if shallow else []) +
+             ['origin', '+refs/heads/*:refs/remotes/origin/*'], repo_path)
+        return commit
+
+    def _checkout_commit(self, commit, repo_path, paths=None):
+        """
+        Checkout commit, working tree of sparse clone is restricted to paths (if given)
+        """
+        revision = self._fetch_commit(commit, repo_path)
+        sparse = paths is not None and self._is_sparse_clone(repo_path)
+        if sparse:
+            self._write_sparse_checkout(repo_path, paths)
+        _git(['checkout', revision, '--quiet'], repo_path)
+        if sparse:
+            # checkout updates only files changed between commits, the rest of working tree follows patterns now
+            _git(['sparse-checkout', 'reapply'], repo_path)
+
+    def _repository_url(self):
+        if ":" in self._server:
+            return f"{self._server}/{self._repository}"
+        else:
+            return f"{self._server}:{self._repository}"
 
     def _repository_dir(self):
-        return self._repository.split("/")[-1].replace(".git", "")
+        return self._repo_dirname
 
-    def _download_dataset_fallback(self, git_path, output_dir, repo_path, use_sub_dirs):
+    def _download_dataset_fallback(self, git_paths, output_dir, use_sub_dirs):
         if self._repository != self.KNOWN_PHX_REPOSITORIES['datasets']:
             # other than datasets repository don't have fallback option
             return False
 
-        self._repository = self.KNOWN_PHX_REPOSITORIES['datasets-old']
+        self._set_repository(self.KNOWN_PHX_REPOSITORIES['datasets-old'])
         try:
-            _logger.warning(f"Fallback to old version of datasets for {git_path} - download may take a long time")
-            self._download_files([git_path], output_dir, repo_path, use_sub_dirs)
+            _logger.warning(f"Fallback to old version of datasets for {git_paths} - download may take a long time")
+            # fallback repository is cloned next to the datasets repository, in cache with its own lock
+            self._download_files_in_repo_dir(git_paths, output_dir, use_sub_dirs)
         except Exception as e:
             # could not download the file from the old datasets repository
             return False
         finally:
             # don't forget to return the correct value for self._repository after fallback
-            self._repository = self.KNOWN_PHX_REPOSITORIES['datasets']
+            self._set_repository(self.KNOWN_PHX_REPOSITORIES['datasets'])
 
         return True
 
     def get_git_path_commit_hash(self, file_repository_path):
         commit = PhxGitRepository.get_git_path_commit(file_repository_path)
+        if _FULL_COMMIT_HASH_RE.fullmatch(commit):
+            return commit
+        # commit given by (abbreviated) hash resolves always to the same full hash, branches and tags can move
+        cacheable = _COMMIT_HASH_RE.fullmatch(commit) is not None
+        cache_key = (self._server, self._repository, commit)
+        if cacheable and cache_key in _RESOLVED_COMMIT_HASHES:
+            return _RESOLVED_COMMIT_HASHES[cache_key]
+        if not cacheable and not self._repo_path:
+            # branch or tag is looked up on the remote, clone is needed only when this fails (repository in repo_path
+            # is used without network access as before)
+            commit_hash = self._resolve_remote_reference(commit)
+            if commit_hash is not None:
+                return commit_hash
         if self._repo_path:
-            _logger.debug(f"Get last commit hash in {self._repo_path} for commit name {commit}")
-            return self._get_git_path_commit_hash(commit, self._repo_path)
+            _logger.debug("Get last commit hash in %s for commit name %s", self._repo_path, commit)
+            commit_hash = self._get_git_path_commit_hash(commit, self._repo_path)
         else:
-            _logger.debug(f"Clone repository {self._repository} into temporary directory")
-            # create temporary directory for cloning the git repository
-            with TemporaryDirectory() as tmpdir:
-                return self._get_git_path_commit_hash(commit, tmpdir)
+            with self._cached_repo_dir() as cache_dir:
+                # resolved hashes are persisted next to the cached clone, so they are shared by all processes
+                hashes_path = os.path.join(cache_dir, f".{self._repository_dir()}.commits.json")
+                known_hashes = self._load_commit_hashes(hashes_path)
+                commit_hash = known_hashes.get(commit) if cacheable else None
+                if commit_hash is None:
+                    _logger.debug("Get last commit hash in %s cached in %s for commit name %s", self._repository,
+                                  cache_dir, commit)
+                    commit_hash = self._get_git_path_commit_hash(commit, cache_dir)
+                    if cacheable:
+                        known_hashes[commit] = commit_hash
+                        self._save_commit_hashes(hashes_path, known_hashes)
+        if cacheable:
+            _RESOLVED_COMMIT_HASHES[cache_key] = commit_hash
+        return commit_hash
+
+    def _resolve_remote_reference(self, reference):
+        """
+        Resolve branch or tag to commit hash by 'git ls-remote' without cloning the repository, git never prompts
+        here (e.g. in batch job), clone asks instead
+        :return: commit hash or None if the reference isn't found (or the remote can't be listed)
+        """
+        ls_remote = _git(['ls-remote', self._repository_url(), reference, f"{reference}^{{}}"], None, check=False,
+                         batch=True)
+        if ls_remote.returncode != 0:
+            return None
+        remote_refs = dict(reversed(line.split("\t", 1)) for line in ls_remote.stdout.splitlines())
+        # peeled annotated tag first (commit instead of tag object), the same precedence of tags as in git
+        for ref in (f"refs/tags/{reference}^{{}}", f"refs/tags/{reference}", f"refs/heads/{reference}", reference):
+            if ref in remote_refs:
+                return remote_refs[ref]
+        return None
+
+    @staticmethod
+    def _load_commit_hashes(hashes_path):
+        try:
+            with open(hashes_path) as fin:
+                return json.load(fin)
+        except (FileNotFoundError, ValueError):
+            return dict()
+
+    @staticmethod
+    def _save_commit_hashes(hashes_path, known_hashes):
+        with open(f"{hashes_path}.tmp", "w") as fout:
+            json.dump(known_hashes, fout)
+        os.replace(f"{hashes_path}.tmp", hashes_path)
+
+    @contextmanager
+    def _cached_repo_dir(self):
+        """
+        Directory with persistent clone of the repository shared by all processes of the user. The repository is
+        locked for the time of usage.
+        """
+        cache_dir = self.REPO_CACHE_ROOT / _NOT_PATH_SAFE_CHARS_RE.sub("_", self._server)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_dir / f".{self._repository_dir()}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield str(cache_dir)
 
     def _get_git_path_commit_hash(self, commit, repo_path):
         self._clone_if_needed(repo_path)
         repo_path = os.path.join(repo_path, self._repository_dir())
-        shell(['git', 'checkout', commit, '--quiet'], cwd=repo_path)
-        with NamedTemporaryFile('w', dir=repo_path, delete=False) as tmpf:
-            shell(['git', 'rev-parse', 'HEAD'], cwd=repo_path, stdout=tmpf.name)
-            tmpf.flush()
-            commit_hash = file2list(tmpf.name)[0]
-        return commit_hash
+        if pygit2 is not None and _COMMIT_HASH_RE.fullmatch(commit):
+            commit_hash = self._resolve_commit_in_process(commit, repo_path)
+            if commit_hash is not None:
+                return commit_hash
+        self._checkout_commit(commit, repo_path)
+        return _git(['rev-parse', 'HEAD'], repo_path).stdout.strip()
 
+    @staticmethod
+    def _resolve_commit_in_process(commit, repo_path):
+        """
+        Resolve (abbreviated) commit hash to full hash by libgit2 without spawning git and checking out the commit
+        :return: full commit hash or None if commit isn't present in repository
+        """
+        try:
+            return str(pygit2.Repository(repo_path).revparse_single(commit).peel(pygit2.Commit).id)
+        except (KeyError, ValueError, pygit2.GitError):
+            return None
 
     @staticmethod
     def is_git_path(path, may_have_branch_name=False):
         """
         Returns true if a path seems to be a path into gitlab repository
         """
+        _, delimiter, commit = path.rpartition('#')
+        if not delimiter:
+            return False
         if may_have_branch_name:
-            return re.match("^.*#[0-9a-zA-Z-_]+$", path) is not None
+            return _GIT_PATH_COMMIT_OR_BRANCH_RE.fullmatch(commit) is not None
         else:
-            return re.match("^.*#[0-9a-f]+$", path) is not None
+            return _GIT_PATH_COMMIT_RE.fullmatch(commit) is not None
 
     @staticmethod
     def join_git_path(repository_path, path):
@@ -214,17 +482,13 @@ class PhxGitRepository(SecurePhxGitRepository):
         Joins a REPOSITORY path with normal one.
         e.g.  join_git_path("some/dir#abcde", "path/to/file") returns "some/dir/path/to/file#abcde"
         """
-        path_git = repository_path.split('#')[0]
-        commit = repository_path.split('#')[1]
+        path_git, _, commit = repository_path.rpartition('#')
         return f"{os.path.join(path_git, path)}#{commit}"
 
     @staticmethod
     def get_git_path_fullpath(repository_path):
-        path = repository_path
-        if '#' in repository_path:
-            path = repository_path.split('#')[0]
-
-        return path
+        path, delimiter, _ = repository_path.rpartition('#')
+        return path if delimiter else repository_path
 
     @staticmethod
     def get_git_path_basename(repository_path):
@@ -232,10 +496,11 @@ class PhxGitRepository(SecurePhxGitRepository):
 
     @staticmethod
     def get_git_path_commit(repository_path):
-        if '#' not in repository_path:
+        _, delimiter, commit = repository_path.rpartition('#')
+        if not delimiter:
             raise ValueError(f"Path '{repository_path}' is not git path in format <path>#<hash_of_commit>")
 
-        return repository_path.split('#')[1]
+        return commit
 
     @classmethod
     def get_default_phx_repository(cls, repository_name: str):
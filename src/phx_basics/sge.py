@@ -3,36 +3,39 @@
 import argparse
 import logging
 import os
-import mmap
+import subprocess
 import sys
 import tempfile
 from pathlib import Path
 from typing import Iterable, Union
 
-import typeguard
-
+from phx_basics._typecheck import typechecked
 from phx_basics.cpu_utils import check_cores
-from phx_basics.file import file2list, file2iter, list2file
+from phx_basics.file import file2list, file2iter
 from phx_basics.shell import shell
 from phx_basics.type import PathType
 
 
+_COUNT_CHUNK_SIZE = 1 << 22  # 4 MiB
+
+
 def mapcount(filename):
     """
-    count rows of file in efficient way
+    count rows of file in efficient way (newlines are counted in big chunks, last row may miss the newline)
     :param filename: path to input file
     :return: number of lines
     """
-    f = open(filename, "r+")
-    buf = mmap.mmap(f.fileno(), 0)
     lines = 0
-    readline = buf.readline
-    while readline():
+    chunk = b""
+    with open(filename, "rb", buffering=0) as fin:
+        for chunk in iter(lambda: fin.read(_COUNT_CHUNK_SIZE), b""):
+            lines += chunk.count(b"\n")
+    if chunk and not chunk.endswith(b"\n"):
         lines += 1
     return lines
 
 
-@typeguard.typechecked
+@typechecked
 class SGE:
     _error_file_suffix = ".error"
     _default_conda_name = "base"
@@ -52,7 +55,8 @@ class SGE:
                               gpu_memory: int = 0,
                               pe_name: str = "smp",
                               cpus: int = 1,
-                              job_name: Union[str, None] = None):
+                              job_name: Union[str, None] = None,
+                              conda_hook_path: Union[PathType, None] = None):
         run_file_lines = list()
 
         run_file_lines.append("#$ -S /bin/bash")
@@ -75,7 +79,12 @@ class SGE:
         if cpus > 0:
             run_file_lines.append(f"#$ -pe {pe_name} {cpus}")  # parallel environment
         run_file_lines.append("#$ -q {}".format(queue_name))  # queue name
-        if conda_env_name:
+        if conda_env_name and conda_hook_path:
+            # hook is printed by conda once into shared file, jobs only source it
+            cls.write_conda_hook(conda_hook_path)
+            run_file_lines.append(f"source {Path(conda_hook_path).absolute()}")
+            run_file_lines.append(f"conda activate {conda_env_name}")
+        elif conda_env_name:
             with tempfile.NamedTemporaryFile() as tmp:
                 # shell(["which", "conda"], check=True, stdout=tmp.name)
                 # conda = file2list(tmp.name)
@@ -89,11 +98,25 @@ class SGE:
         run_file_lines.append("exit $ERROR_CODE")
         return run_file_lines
 
+    @staticmethod
+    def write_conda_hook(conda_hook_path: PathType):
+        """
+        Write bash hook of conda into file if it doesn't exist yet
+        """
+        if os.path.exists(conda_hook_path):
+            return
+        hook = subprocess.check_output(["conda", "shell.bash", "hook"], text=True)
+        # written under temporary name, so parallel submissions never source partial hook
+        tmp_path = f"{conda_hook_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fout:
+            fout.write(hook)
+        os.replace(tmp_path, conda_hook_path)
+
 
 
 def sge_manage_task(commands_file_path, name=None, output_file=None, error_file=None, memory_alloc=4,
                     dont_export_env_variables=False, sync=True, queue="all.q", pe_slots=0, pe_name="smp",
-                    project_name=None, gpu=0, conda_environment=None):
+                    project_name=None, gpu=0, conda_environment=None, nj=None):
     """
     Run commands from input file in SGE by shell script; If processing fail CalledProcessError is called with printing
     of stdout and stderr
@@ -109,6 +132,7 @@ def sge_manage_task(commands_file_path, name=None, output_file=None, error_file=
     :param pe_slots: number of slots for paralel envirorment
     :param pe_name: name of paralel envirorment - not used if pe_slot is None
     :param conda_environment: path to conda binary, the conda initialization will be prepended before running the commands
+    :param nj: number of commands in input file if already known (file isn't read to count them then)
     :return: 
     """
     commands_file_path = os.path.abspath(commands_file_path)
@@ -120,7 +144,8 @@ def sge_manage_task(commands_file_path, name=None, output_file=None, error_file=
     run_file_lines.append("exit $ERROR_CODE")
     with open(commands_file_path+".run.sh", "w") as fout:
         fout.write("\n".join(run_file_lines))
-    nj = mapcount(commands_file_path)
+    if nj is None:
+        nj = mapcount(commands_file_path)
     cmd = ["qsub", "-t", "1:{}".format(str(nj)), commands_file_path+".run.sh"]
     logging.debug("Runing SGE job '{}'".format(" ".join(cmd)))
     try:
@@ -139,23 +164,26 @@ def gpu_manage_task(commands_file_path, name=None, output_file=None, error_file=
     if not free_gpu_script:
         free_gpu_script = str(Path(__file__).absolute().parent / "free_gpus.py")
     tmp_dir = Path(commands_file_path).parent / "_jobs"
-    os.makedirs(tmp_dir)
+    os.makedirs(tmp_dir, exist_ok=True)
     new_command_list_path = commands_file_path + "_new"
-    new_command_list = list()
     sleep = (sleep_cycle - 1) * sleep_period
-    for i, command in enumerate(file2iter(commands_file_path)):
-        script_path = tmp_dir / f"{i}.sh"
-        new_command_list.append(f"bash {script_path}")
-        new_script = [f"export CUDA_VISIBLE_DEVICES=$({sys.executable} {free_gpu_script})",
-                      # "echo 'free gpu:' $CUDA_VISIBLE_DEVICES $HOSTNAME", # for debuging only
-                      command]
-        if sleep_period and sleep_period > 0:
-            sleep += sleep_period
-            if sleep_cycle:
-                sleep %= (sleep_cycle * sleep_period)
-            new_script = [f"sleep {sleep}"] + new_script
-        list2file(new_script, script_path)
-    list2file(new_command_list, new_command_list_path)
+    nj = 0
+    # commands and scripts are written while reading, nothing is accumulated in memory
+    with open(new_command_list_path, "w") as command_list:
+        for i, command in enumerate(file2iter(commands_file_path)):
+            nj = i + 1
+            script_path = tmp_dir / f"{i}.sh"
+            command_list.write(f"bash {script_path}\n")
+            new_script = [f"export CUDA_VISIBLE_DEVICES=$({sys.executable} {free_gpu_script})",
+                          # "echo 'free gpu:' $CUDA_VISIBLE_DEVICES $HOSTNAME", # for debuging only
+                          command]
+            if sleep_period and sleep_period > 0:
+                sleep += sleep_period
+                if sleep_cycle:
+                    sleep %= (sleep_cycle * sleep_period)
+                new_script.insert(0, f"sleep {sleep}")
+            # whole script by one write
+            script_path.write_text("\n".join(new_script) + "\n")
     sge_manage_task(new_command_list_path,
                     name=name,
                     output_file=output_file,
@@ -167,7 +195,8 @@ def gpu_manage_task(commands_file_path, name=None, output_file=None, error_file=
                     pe_slots=pe_slots,
                     pe_name=pe_name,
                     project_name=project_name,
-                    gpu=gpu)
+                    gpu=gpu,
+                    nj=nj)
 
 
 def main():
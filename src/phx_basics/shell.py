@@ -1,14 +1,17 @@
 import logging
 import os
+import re
 import subprocess
 import shlex
-from pathlib import Path
+from contextlib import ExitStack
 
 from phx_basics.file import check_file, check_dir
 from phx_basics.logging_tools import logging_format
 
 _logger = logging.getLogger(__name__)
 
+_ENV_RECORD_RE = re.compile(rb"([^=\x00]+)=([^\x00]*)\x00")
+
 
 class LogFilter(logging.Filter):
     """
@@ -24,18 +27,20 @@ class LogFilter(logging.Filter):
         try:
             if type(levels) == int:
                 if levels in log_levels:
-                    self.levels = {levels}
+                    self.levels = frozenset({levels})
                 else:
                     raise TypeError()
             elif type(levels) in [list, set]:
                 if not set(levels).issubset(log_levels):
                     raise TypeError()
-                self.levels = levels
+                self.levels = frozenset(levels)
             else:
                 raise TypeError()
         except TypeError:
             raise TypeError(
                 "Argument 'levels' have to be integer or set or list of these integers: 0, 10, 20, 30, 40, 50")
+        # bound membership test of the set, filter is called for every record
+        self._contains_level = self.levels.__contains__
 
     def filter(self, record):
         """
@@ -43,7 +48,7 @@ class LogFilter(logging.Filter):
         :param record: mandatory input for logging filtering
         :return: boolean to pass
         """
-        return record.levelno in self.levels
+        return self._contains_level(record.levelno)
 
 
 class ShellLogger(logging.Logger):
@@ -91,7 +96,9 @@ def shell(cmd, cwd=None, input_string=None, stdout=None, stderr=None, use_loggin
     :param check: raise exception when return code from subprocess is not 0
     :param truncate_last_newline: delete last newline in stdout file if present
     :param ext_logger: Use external logger instead of the local.
-    :return: Return output of the subprocess.run
+    :return: Return output of the subprocess.run. Output written directly into stdout/stderr file (without use_logging,
+             debug and ext_logger) isn't captured, its stdout/stderr attribute (also of raised CalledProcessError) is
+             None then - read the file instead
     """
     def check_log(log):
         """
@@ -116,14 +123,20 @@ def shell(cmd, cwd=None, input_string=None, stdout=None, stderr=None, use_loggin
                              "Use parameter 'stdout' and/or 'stderr' instead.")
 
     def truncate(file_path):
-        linesep_len = len(os.linesep)
-        if file_path and os.path.exists(file_path) and Path(file_path).stat().st_size >= linesep_len:
-            if file_path:
-                with open(file_path, "rb+") as file:
-                    file.seek(-linesep_len, 2)
-                    if file.read(1) == os.linesep.encode("utf-8"):
-                        file.seek(-linesep_len, 2)
-                        file.truncate()
+        if not file_path:
+            return
+        linesep = os.linesep.encode("utf-8")
+        try:
+            size = os.stat(file_path).st_size
+        except FileNotFoundError:
+            return
+        if size >= len(linesep):
+            # file is opened only for reading, it is truncated by path just when it ends with newline
+            with open(file_path, "rb") as file:
+                file.seek(-len(linesep), os.SEEK_END)
+                ends_with_linesep = file.read() == linesep
+            if ends_with_linesep:
+                os.truncate(file_path, size - len(linesep))
 
     assert type(cmd) == list
     check_command(cmd)
@@ -132,6 +145,9 @@ def shell(cmd, cwd=None, input_string=None, stdout=None, stderr=None, use_loggin
     assert type(check) == bool
     if cwd is not None:
         check_dir(cwd)
+    # unformatted output is written by the subprocess directly into the output files, it isn't kept in memory then
+    direct_stdout = ext_logger is None and not use_logging and not debug and stdout is not None
+    direct_stderr = ext_logger is None and not use_logging and not debug and stderr is not None
     if ext_logger is not None:
         logger = ext_logger
     else:
@@ -140,25 +156,39 @@ def shell(cmd, cwd=None, input_string=None, stdout=None, stderr=None, use_loggin
         _logger.debug(f"Running command: '{' '.join(cmd)}'")
         logger = ShellLogger(use_logging)
         if stdout == stderr and stdout is not None:
-            logger.addFilteredHandler(stdout, [logging.DEBUG if debug else logging.INFO, logging.ERROR])
+            if not direct_stdout:
+                logger.addFilteredHandler(stdout, [logging.DEBUG if debug else logging.INFO, logging.ERROR])
+        else:
+            if not direct_stdout:
+                logger.addFilteredHandler(stdout, logging.DEBUG if debug else logging.INFO)
+            if not direct_stderr:
+                logger.addFilteredHandler(stderr, logging.ERROR)
+    with ExitStack() as output_files:
+        stdout_target = output_files.enter_context(open(stdout, "wb")) if direct_stdout else subprocess.PIPE
+        if direct_stderr:
+            stderr_target = subprocess.STDOUT if stderr == stdout else output_files.enter_context(open(stderr, "wb"))
         else:
-            logger.addFilteredHandler(stdout, logging.DEBUG if debug else logging.INFO)
-            logger.addFilteredHandler(stderr, logging.ERROR)
-    try:
-        result = subprocess.run(cmd, input=input_string, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                universal_newlines=True, check=check, cwd=cwd, env=env, shell=shell)
-    except subprocess.CalledProcessError as e:
-        logging.error("\n".join(("Stderr in subprocess:", "STDOUT:", e.stdout, "STDERR:", e.stderr)))
-        if stderr is not None:
-            logger.error(e.stderr)
-        raise e
-    if result.stdout != "":
+            stderr_target = subprocess.PIPE
+        try:
+            result = subprocess.run(cmd, input=input_string, stdout=stdout_target, stderr=stderr_target,
+                                    universal_newlines=True, check=check, cwd=cwd, env=env, shell=shell)
+        except subprocess.CalledProcessError as e:
+            logging.error("\n".join(("Stderr in subprocess:",
+                                     "STDOUT:", e.stdout if e.stdout is not None else f"see '{stdout}'",
+                                     "STDERR:", e.stderr if e.stderr is not None else f"see '{stderr}'")))
+            if stderr is not None and e.stderr is not None:
+                logger.error(e.stderr)
+            raise e
+    if result.stdout:
         logger.info(result.stdout)
-    if result.stderr != "":
+    if result.stderr:
         logger.error(result.stderr)
     if truncate_last_newline:
-        truncate(stdout)
-        truncate(stderr)
+        # only logging adds the newline, output written directly is exact
+        if not direct_stdout:
+            truncate(stdout)
+        if not direct_stderr:
+            truncate(stderr)
     return result
 
 
@@ -169,17 +199,11 @@ def shell_source(script, update_env=False):
     :param update_env: If True, it will set or update environment variables in os.environ .
     :return: Return dictionary with variables extracted from the script
     """
-    pipe = subprocess.Popen(". %s && env -0" % script, stdout=subprocess.PIPE, shell=True)
-    output = pipe.communicate()[0].decode('utf-8')
-    output = output[:-1]  # fix for index out for range in 'env[ line[0] ] = line[1]'
-
-    env = {}
-    # split using null char
-    for line in output.split('\x00'):
-        line = line.split('=', 1)
-        if len(line) != 2:
-            continue
-        env[line[0]] = line[1]
+    output = subprocess.run(["bash", "-c", f". {shlex.quote(str(script))} && env -0"], stdout=subprocess.PIPE,
+                            check=True).stdout
+
+    # null char terminated 'name=value' records
+    env = {name.decode('utf-8'): value.decode('utf-8') for name, value in _ENV_RECORD_RE.findall(output)}
 
     if update_env:
         os.environ.update(env)